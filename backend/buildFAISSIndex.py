@@ -4,6 +4,7 @@ import faiss
 import os
 import re
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
@@ -11,6 +12,9 @@ from langchain_core.documents import Document
 from langchain_huggingface import HuggingFaceEndpointEmbeddings
 from langchain_community.docstore.in_memory import InMemoryDocstore
 
+from post_analytics import build_post_aggregates, save_post_aggregates
+from shard_store import load_shard_manifest, save_shard_manifest, dir_size_bytes
+
 # ---------- Normalize Weibo create_time format ----------
 def normalize_weibo_create_time(raw: str, reference: datetime | None = None, default_year: int | None = None) -> str | None:
     """
@@ -105,6 +109,7 @@ def build_documents(df: pd.DataFrame) -> list[Document]:
         content_en = str(row.get('content_en', ''))
         content = f"Chinese: {content_zn}\nEnglish: {content_en}"
 
+        uid = row.get('uid')  # NaN when missing, which is truthy
         raw_time = row.get("create_time") or row.get("created_at")  # supports either column name
         created_at = normalize_weibo_create_time(raw_time, default_year=2025)
 
@@ -115,6 +120,7 @@ def build_documents(df: pd.DataFrame) -> list[Document]:
         # Build metadata and document
         metadata = {
             'post_id': row.get('weibo_id') or None,
+            'uid': uid.strip() if isinstance(uid, str) and uid.strip() else None,
             'created_at': created_at,
             'raw_zn': content_zn,
             'raw_en': content_en,
@@ -149,10 +155,8 @@ def SimpleTextSplitter(documents: list[Document], chunk_size: int = 500, chunk_o
     return split_docs
 
 # ---------- Build FAISS index ----------
-def build_faiss_index(csv_path: str, index_dir: str = "weibo_faiss_index"):
-    df = load_processed_posts(csv_path)
+def build_faiss_index_from_df(df: pd.DataFrame, index_dir: str, embeddings) -> dict:
     documents = build_documents(df)
-    embeddings = get_embedding_model(provider="openai")
 
     print("Splitting documents into chunks...")
     split_docs = SimpleTextSplitter(documents, chunk_size=500, chunk_overlap=50)
@@ -204,7 +208,111 @@ def build_faiss_index(csv_path: str, index_dir: str = "weibo_faiss_index"):
     print(f"Saving FAISS index to: {index_dir}...")
     storevector.save_local(index_dir)
 
+    # Exact engagement stats over every post, for aggregate questions that skip retrieval
+    print("Building post aggregates...")
+    aggregates = build_post_aggregates([d.metadata for d in documents])
+    save_post_aggregates(aggregates, index_dir)
+
     print("FAISS index built and saved successfully! ✅")
+    return {"num_posts": len(documents), "num_vectors": int(index.ntotal)}
+
+def build_faiss_index(csv_path: str, index_dir: str = "weibo_faiss_index"):
+    df = load_processed_posts(csv_path)
+    embeddings = get_embedding_model(provider="openai")
+    return build_faiss_index_from_df(df, index_dir, embeddings)
+
+# ---------- Load account profiles (nickname + authentication) for prompts ----------
+def load_user_profiles(csv_path: str = "../data/raw/userprofile.csv") -> dict:
+    if not os.path.exists(csv_path):
+        print(f"No user profiles found at: {csv_path}")
+        return {}
+    df = pd.read_csv(csv_path, dtype=str)
+    profiles = {}
+    for _, row in df.iterrows():
+        uid = str(row.get("userid") or "").strip()
+        if not uid or uid.lower() == "nan":
+            continue
+        nickname = row.get("nickname")
+        description = row.get("authentication")
+        profiles[uid] = {
+            "nickname": nickname if isinstance(nickname, str) else None,
+            "description": description if isinstance(description, str) else None,
+        }
+    return profiles
+
+# ---------- Build one FAISS shard per account, in parallel ----------
+def build_shard_indexes(
+    csv_path: str,
+    shards_dir: str = "weibo_shards",
+    profile_csv: str = "../data/raw/userprofile.csv",
+    uids: list[str] | None = None,
+    max_workers: int = 4,
+    provider: str = "openai",
+) -> dict:
+    """
+    Splits posts by `uid` and builds each account's index into shards_dir/<uid>/.
+    Shards are independent, so embedding calls for different accounts run concurrently.
+    The manifest is rewritten after every finished shard, so an interrupted run keeps its progress.
+    """
+    df = load_processed_posts(csv_path)
+    if "uid" not in df.columns:
+        raise ValueError("posts CSV has no 'uid' column; cannot shard by account.")
+    df["uid"] = df["uid"].astype(str).str.strip()
+
+    wanted = [str(u) for u in uids] if uids else sorted(df["uid"].dropna().unique())
+    groups = {uid: df[df["uid"] == uid] for uid in wanted}
+    missing = [uid for uid, g in groups.items() if g.empty]
+    if missing:
+        print(f"⚠️ No posts for accounts (crawl them first): {missing}")
+    groups = {uid: g for uid, g in groups.items() if not g.empty}
+
+    embeddings = get_embedding_model(provider=provider)
+    profiles = load_user_profiles(profile_csv)
+
+    manifest = load_shard_manifest(shards_dir)
+    if manifest.get("embedding_provider") not in (None, provider):
+        raise ValueError(
+            f"Existing shards use '{manifest['embedding_provider']}' embeddings; "
+            f"rebuild them all to switch to '{provider}'."
+        )
+    manifest["embedding_provider"] = provider
+
+    print(f"Building {len(groups)} shards with {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(build_faiss_index_from_df, g, os.path.join(shards_dir, uid), embeddings): uid
+            for uid, g in groups.items()
+        }
+        for future in as_completed(futures):
+            uid = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"⚠️ Failed to build shard {uid}: {e}")
+                continue
+            manifest["shards"][uid] = {
+                "index_dir": uid,
+                **profiles.get(uid, {"nickname": None, "description": None}),
+                **stats,
+                "size_bytes": dir_size_bytes(os.path.join(shards_dir, uid)),
+                "built_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            save_shard_manifest(manifest, shards_dir)
+            print(f"Shard {uid} done ({stats['num_posts']} posts).")
+
+    print(f"Shard manifest: {len(manifest['shards'])} accounts in {shards_dir} ✅")
+    return manifest
 
 if __name__ == "__main__":
-    build_faiss_index("../data/processed/posts_processed.csv", "weibo_faiss_index")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the Weibo FAISS index.")
+    parser.add_argument("--shards", action="store_true", help="build one index shard per account (uid) instead of a single index")
+    parser.add_argument("--uids", nargs="*", help="only (re)build shards for these accounts")
+    parser.add_argument("--workers", type=int, default=4, help="shards built in parallel")
+    args = parser.parse_args()
+
+    if args.shards:
+        build_shard_indexes("../data/processed/posts_processed.csv", "weibo_shards", uids=args.uids, max_workers=args.workers)
+    else:
+        build_faiss_index("../data/processed/posts_processed.csv", "weibo_faiss_index")
@@ -0,0 +1,475 @@
+import os
+import re
+import calendar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ---------- Columnar aggregates over post engagement ----------
+AGGREGATES_FILENAME = "post_aggregates.npz"
+METRICS = ("like_num", "comment_num", "repost_num")
+METRIC_LABELS = {"like_num": "likes", "comment_num": "comments", "repost_num": "reposts"}
+
+def parse_count(raw) -> int:
+    """
+    Converts a Weibo counter ('1346444', '1.2万', '', None) to an int, 0 if unknown.
+    """
+    if raw is None:
+        return 0
+    s = str(raw).strip().replace(",", "")
+    if not s or s.lower() == "nan":
+        return 0
+    m = re.match(r"^(\d+(?:\.\d+)?)\s*(万|w|W)?\+?$", s)
+    if not m:
+        return 0
+    value = float(m.group(1))
+    if m.group(2):
+        value *= 10000
+    return int(value)
+
+def _to_datetime64(raw) -> np.datetime64:
+    if not raw:
+        return np.datetime64("NaT", "s")
+    try:
+        return np.datetime64(datetime.fromisoformat(str(raw)), "s")
+    except Exception:
+        return np.datetime64("NaT", "s")
+
+def _group_by(keys: np.ndarray, prefix: str, post_arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    groups, inverse = np.unique(keys, return_inverse=True)
+    out = {
+        prefix: groups,
+        f"{prefix}_count": np.bincount(inverse, minlength=len(groups)).astype(np.int64),
+    }
+    for metric in METRICS:
+        weights = post_arrays[f"post_{metric}"].astype(np.float64)
+        out[f"{prefix}_{metric}"] = np.bincount(inverse, weights=weights, minlength=len(groups)).astype(np.int64)
+    return out
+
+def build_post_aggregates(metadatas: List[dict]) -> Dict[str, np.ndarray]:
+    """
+    Builds per-post, per-day and per-month arrays from post metadata (one entry per post; chunk duplicates are dropped).
+    Posts are sorted by created_at; posts without a parseable time only count in per-post arrays.
+    """
+    seen = set()
+    rows = []
+    for m in metadatas:
+        m = m or {}
+        key = m.get("post_id") or (m.get("created_at"), m.get("raw_zn"))
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(m)
+
+    created_at = np.array([_to_datetime64(m.get("created_at")) for m in rows], dtype="datetime64[s]")
+    order = np.argsort(created_at, kind="stable")  # NaT sorts last
+
+    aggs: Dict[str, np.ndarray] = {
+        "post_id": np.array([str(m.get("post_id") or "") for m in rows], dtype=str)[order],
+        "post_uid": np.array([str(m.get("uid") or "") for m in rows], dtype=str)[order],
+        "post_created_at": created_at[order],
+    }
+    for metric in METRICS:
+        aggs[f"post_{metric}"] = np.array([parse_count(m.get(metric)) for m in rows], dtype=np.int64)[order]
+
+    return _add_groups(aggs)
+
+def _add_groups(aggs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    dated = ~np.isnat(aggs["post_created_at"])
+    dated_arrays = {name: arr[dated] for name, arr in aggs.items()}
+    aggs.update(_group_by(dated_arrays["post_created_at"].astype("datetime64[D]"), "day", dated_arrays))
+    aggs.update(_group_by(dated_arrays["post_created_at"].astype("datetime64[M]"), "month", dated_arrays))
+    return aggs
+
+def merge_post_aggregates(aggs_list: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Combines per-account aggregates into one set (post arrays concatenated, day / month groups recomputed).
+    An empty list gives empty aggregates, which answer "There are no posts".
+    """
+    if not aggs_list:
+        return build_post_aggregates([])
+    if len(aggs_list) == 1:
+        return aggs_list[0]
+    post_keys = ["post_id", "post_uid", "post_created_at"] + [f"post_{metric}" for metric in METRICS]
+    merged = {
+        name: np.concatenate([a.get(name, np.full(len(a["post_id"]), "")) for a in aggs_list])
+        for name in post_keys
+    }
+    order = np.argsort(merged["post_created_at"], kind="stable")
+    return _add_groups({name: arr[order] for name, arr in merged.items()})
+
+def save_post_aggregates(aggs: Dict[str, np.ndarray], index_dir: str) -> str:
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(str(index_dir), AGGREGATES_FILENAME)
+    np.savez_compressed(path, **aggs)
+    print(f"Saved post aggregates ({len(aggs['post_id'])} posts) to: {path}")
+    return path
+
+def load_post_aggregates(index_dir: str) -> Optional[Dict[str, np.ndarray]]:
+    path = os.path.join(str(index_dir), AGGREGATES_FILENAME)
+    if not os.path.exists(path):
+        print(f"No post aggregates found at: {path}")
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        aggs = {name: data[name] for name in data.files}
+    print(f"Loaded post aggregates for {len(aggs['post_id'])} posts.")
+    return aggs
+
+
+# ---------- Heuristic to detect aggregate / engagement questions ----------
+# Engagement words only count in their noun sense: "he likes / shares / comments" is a verb and
+# "like" alone is usually one too ("what does he like most"), so those questions stay on retrieval.
+_NOT_AFTER_SUBJECT = r"(?<!\bhe )(?<!\bshe )(?<!\bthey )(?<!\bwho )(?<!\bi )(?<!\bit )"
+
+def _engagement_noun(word: str, past: str) -> List[str]:
+    return [
+        rf"{_NOT_AFTER_SUBJECT}\b{word}s\b",
+        rf"\b(?:most|least)[- ]{past}\s+(?:posts?|weibos?)\b",
+        rf"\b(?:posts?|weibos?)\b[^.?!]*\b(?:most|least)[- ]{past}\b",
+    ]
+
+METRIC_PATTERNS = {
+    "like_num": _engagement_noun("like", "liked") + [r"点赞", r"获赞", r"赞数"],
+    "comment_num": _engagement_noun("comment", "commented") + [r"评论(?:数|量|最多|最少|最高|最低)", r"(?:多少|几)条?评论", r"平均评论"],
+    "repost_num": _engagement_noun("repost", "reposted") + [r"转发(?:数|量|最多|最少|最高|最低)", r"(?:多少|几)次?转发", r"平均转发"],
+}
+OP_PATTERNS = [
+    ("avg", [r"\baverage\b", r"\bmean\b", r"\bavg\b", r"平均"]),
+    ("top", [r"\bmost\b", r"\bhighest\b", r"\btop\b", r"\bmaximum\b", r"\bmax\b", r"\bbest\b", r"\bmost popular\b", r"最多", r"最高", r"最火", r"最受欢迎"]),
+    ("bottom", [r"\bleast\b", r"\bfewest\b", r"\blowest\b", r"\bminimum\b", r"\bmin\b", r"最少", r"最低"]),
+    ("total", [r"\btotal\b", r"\bin total\b", r"\baltogether\b", r"\bsum\b", r"总共", r"一共", r"总计", r"总数"]),
+    ("count", [r"\bhow many\b", r"\bnumber of\b", r"\bcount\b", r"多少", r"几条", r"几篇"]),
+]
+GROUP_PATTERNS = {
+    "account": [r"\beach account\b", r"\bper account\b", r"\bevery account\b", r"\bwhich account\b", r"\bby account\b",
+                r"哪个账号", r"哪一个账号", r"每个账号", r"各个?账号"],
+    "month": [r"\bper month\b", r"\bmonthly\b", r"\beach month\b", r"\bevery month\b", r"\bwhich month\b", r"每月", r"每个月", r"哪个月", r"哪一个月"],
+    "day": [r"\bper day\b", r"\bdaily\b", r"\beach day\b", r"\bevery day\b", r"\bwhich day\b", r"每天", r"每日", r"哪天", r"哪一天"],
+}
+# Questions about what a post says need retrieval, not arithmetic
+CONTENT_PATTERNS = [r"\babout\b", r"\bmention", r"\bsay\b", r"\bsaid\b", r"\btalk", r"提到", r"关于", r"说了", r"内容"]
+# Questions about one particular post ("his latest post") must not get a corpus-wide number
+SINGLE_POST_PATTERNS = [
+    r"\b(?:latest|newest|recent|recently|last\s+(?:post|weibo))\b", r"\b(?:this|that|his|her|their)\s+(?:post|weibo)\b",
+    r"最近", r"最新", r"近期", r"这条", r"那条", r"上一条",
+]
+# Filters the query engine cannot apply (media, content, thresholds, weeks / days)
+QUALIFIER_PATTERNS = [
+    r"\bwith\b(?!\s+(?:the\s+)?(?:most|least|fewest|highest|lowest)\b)", r"\bwithout\b", r"\bcontaining\b", r"\binclud",
+    r"\b(?:videos?|images?|photos?|pictures?|pics?)\b", r"\b(?:this|last)\s+week\b", r"\b(?:today|yesterday)\b",
+    r"带", r"含有", r"包含", r"视频", r"图片", r"照片", r"配图", r"本周", r"上周", r"这周", r"今天", r"昨天",
+]
+# Relative periods, resolved against the newest post in the aggregates
+RELATIVE_PERIOD_PATTERNS = [
+    ({"relative": "month", "offset": 0}, [r"\bthis month\b", r"本月", r"这个月"]),
+    ({"relative": "month", "offset": -1}, [r"\blast month\b", r"\bprevious month\b", r"上个月", r"上月"]),
+    ({"relative": "year", "offset": 0}, [r"\bthis year\b", r"今年"]),
+    ({"relative": "year", "offset": -1}, [r"\blast year\b", r"\bprevious year\b", r"去年"]),
+]
+
+MONTH_NAMES = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTH_NAMES.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+def _match_any(patterns: List[str], s: str) -> bool:
+    return any(re.search(p, s) for p in patterns)
+
+def _parse_period(s: str) -> Optional[dict]:
+    """
+    Extracts a year / month / day filter ('2024-12-25', 'October 2024', '2024年10月', '10月', '2024').
+    Relative periods ('last month', '今年') come back as {"relative": "month" | "year", "offset": 0 | -1}.
+    Returns {"invalid": True} when the question names an impossible date ('2024-13', '10月32日').
+    """
+    for relative, patterns in RELATIVE_PERIOD_PATTERNS:
+        if _match_any(patterns, s):
+            return dict(relative)
+
+    period = None
+    m = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", s)
+    m2 = re.search(r"\b(\d{4})-(\d{1,2})\b", s)
+    m3 = re.search(r"(?:(\d{4})\s*年\s*)?(\d{1,2})\s*月(?:\s*(\d{1,2})\s*[日号])?", s)
+    if m:
+        period = {"year": int(m.group(1)), "month": int(m.group(2)), "day": int(m.group(3))}
+    elif m2:
+        period = {"year": int(m2.group(1)), "month": int(m2.group(2))}
+    elif m3:
+        period = {
+            "year": int(m3.group(1)) if m3.group(1) else None,
+            "month": int(m3.group(2)),
+            "day": int(m3.group(3)) if m3.group(3) else None,
+        }
+    else:
+        month_re = "|".join(sorted(MONTH_NAMES, key=len, reverse=True))
+        m = re.search(rf"\b({month_re})\b\.?(?:\s+(\d{{4}}))?", s)
+        if m and m.group(1) == "may" and not (m.group(2) or re.search(r"\b(?:in|during)\s+may\b", s)):
+            m = None  # "may" is usually the verb
+        if m:
+            period = {"year": int(m.group(2)) if m.group(2) else None, "month": MONTH_NAMES[m.group(1)]}
+        else:
+            m = re.search(r"\b(?:in|during)\s+(\d{4})\b|(\d{4})\s*年", s)
+            if m:
+                period = {"year": int(m.group(1) or m.group(2))}
+
+    if period is not None and not _is_valid_period(period):
+        return {"invalid": True}
+    return period
+
+def _is_valid_period(period: dict) -> bool:
+    year, month, day = period.get("year"), period.get("month"), period.get("day")
+    if year is not None and not 1 <= year <= 9999:
+        return False
+    if month is None:
+        return day is None
+    if not 1 <= month <= 12:
+        return False
+    if day is None:
+        return True
+    # Without a year, allow Feb 29 (2000 is a leap year); _resolve_period re-checks against the real year
+    return 1 <= day <= calendar.monthrange(year or 2000, month)[1]
+
+def classify_aggregate_question(q: str) -> Optional[dict]:
+    """
+    Returns a structured query {op, metric, group, period, n} for aggregate questions, else None.
+    metric is None when the question counts posts rather than engagement.
+    """
+    s = (q or "").lower()
+    if not s.strip() or _match_any(CONTENT_PATTERNS + SINGLE_POST_PATTERNS + QUALIFIER_PATTERNS, s):
+        return None
+
+    metric = next((name for name, patterns in METRIC_PATTERNS.items() if _match_any(patterns, s)), None)
+    op = next((name for name, patterns in OP_PATTERNS if _match_any(patterns, s)), None)
+    group = next((name for name, patterns in GROUP_PATTERNS.items() if _match_any(patterns, s)), None)
+    counts_posts = bool(re.search(r"\bposts?\b|\bweibos?\b|微博|帖子|动态|发了", s))
+
+    if op is None:
+        return None
+    if metric is None and op in ("top", "bottom") and re.search(r"\bpopular\b|受欢迎|最火", s):
+        metric = "like_num"
+    if metric is None and not counts_posts:
+        return None
+    if metric is None and op in ("top", "bottom") and group is None:
+        # "which post is the most ..." without an engagement metric is not arithmetic
+        return None
+
+    period = _parse_period(s)
+    if period is not None and period.get("invalid"):
+        # An impossible date is better left to retrieval than answered for the wrong period
+        return None
+
+    n = 1
+    m = re.search(r"\btop\s*(\d+)\b|前\s*(\d+)", s)
+    if m:
+        n = max(1, min(int(m.group(1) or m.group(2)), 20))
+
+    return {"op": op, "metric": metric, "group": group, "period": period, "n": n}
+
+
+# ---------- Query engine over the aggregate arrays ----------
+def _resolve_period(period: Optional[dict], aggs: Dict[str, np.ndarray]) -> Optional[Tuple[np.datetime64, np.datetime64, str]]:
+    """
+    Turns a parsed period into a [start, end) range. A month without a year resolves to the latest year that has posts in it.
+    Returns None when the period is not a real date (e.g. Feb 29 resolved to a non-leap year).
+    """
+    if not period:
+        return None
+    if period.get("relative"):
+        return _resolve_relative_period(period, aggs)
+    year, month, day = period.get("year"), period.get("month"), period.get("day")
+
+    if year is None and month is not None:
+        months = aggs["month"]
+        candidates = [m for m in months if int(str(m)[5:7]) == month]
+        year = int(str(candidates[-1])[:4]) if candidates else datetime.now().year
+
+    if not _is_valid_period({"year": year, "month": month, "day": day}):
+        return None
+
+    if day is not None:
+        start = np.datetime64(f"{year:04d}-{month:02d}-{day:02d}", "D")
+        return start.astype("datetime64[s]"), (start + 1).astype("datetime64[s]"), str(start)
+    if month is not None:
+        start = np.datetime64(f"{year:04d}-{month:02d}", "M")
+        return start.astype("datetime64[s]"), (start + 1).astype("datetime64[s]"), str(start)
+    start = np.datetime64(f"{year:04d}", "Y")
+    return start.astype("datetime64[s]"), (start + 1).astype("datetime64[s]"), str(start)
+
+def _resolve_relative_period(period: dict, aggs: Dict[str, np.ndarray]) -> Optional[Tuple[np.datetime64, np.datetime64, str]]:
+    created = aggs["post_created_at"]
+    dated = created[~np.isnat(created)]
+    if len(dated) == 0:
+        return None
+    unit = "M" if period["relative"] == "month" else "Y"
+    start = dated[-1].astype(f"datetime64[{unit}]") + period["offset"]  # post arrays are sorted by time
+    return start.astype("datetime64[s]"), (start + 1).astype("datetime64[s]"), str(start)
+
+def _account_groups(aggs: Dict[str, np.ndarray], metric: Optional[str], resolved) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-account counts / sums keyed on post_uid, computed from the post arrays so the period filter
+    applies and shards loaded from older files (uid set by ShardStore) are grouped correctly.
+    """
+    post_uids = aggs.get("post_uid", np.full(len(aggs["post_id"]), ""))
+    post_arrays = {name: arr for name, arr in aggs.items() if name.startswith("post_")}
+    post_arrays["post_uid"] = post_uids
+    if resolved:
+        created = aggs["post_created_at"]
+        mask = (created >= resolved[0]) & (created < resolved[1])
+        post_arrays = {name: arr[mask] for name, arr in post_arrays.items()}
+    groups = _group_by(post_arrays["post_uid"], "account", post_arrays)
+    return groups["account"], groups[f"account_{metric}"] if metric else groups["account_count"]
+
+def _fmt(value) -> str:
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.1f}"
+    return f"{int(value):,}"
+
+def run_aggregate_query(query: dict, aggs: Dict[str, np.ndarray]) -> Tuple[str, List[str]]:
+    """
+    Answers a classified aggregate query exactly over the full corpus.
+    Returns (facts text, post_ids referenced by the answer).
+    """
+    op, metric, group, n = query["op"], query["metric"], query["group"], query.get("n", 1)
+    label = METRIC_LABELS.get(metric, "posts")
+    resolved = _resolve_period(query.get("period"), aggs)
+    if query.get("period") and resolved is None:
+        if query["period"].get("relative"):
+            return "There are no dated posts to resolve the period against.", []
+        return "The date in the question is not a valid calendar date.", []
+    scope = f" in {resolved[2]}" if resolved else ""
+
+    if group is None:
+        created = aggs["post_created_at"]
+        mask = np.ones(len(created), dtype=bool)
+        if resolved:
+            mask = (created >= resolved[0]) & (created < resolved[1])
+        idx = np.flatnonzero(mask)
+        if len(idx) == 0:
+            return f"There are no posts{scope}.", []
+
+        if metric is None:
+            return f"Number of posts{scope}: {len(idx):,}.", []
+
+        values = aggs[f"post_{metric}"][idx]
+        if op in ("top", "bottom"):
+            order = np.argsort(values, kind="stable")
+            if op == "top":
+                order = order[::-1]
+            picked = idx[order[:n]]
+            word = "most" if op == "top" else "fewest"
+            lines = [f"Post(s) with the {word} {label}{scope} (out of {len(idx):,} posts):"]
+            post_uids = aggs.get("post_uid")
+            for rank, i in enumerate(picked, start=1):
+                account = f"uid={post_uids[i]} | " if post_uids is not None and post_uids[i] else ""
+                lines.append(
+                    f"{rank}. {account}post_id={aggs['post_id'][i]} | time={aggs['post_created_at'][i]} | "
+                    f"likes={_fmt(aggs['post_like_num'][i])} | comments={_fmt(aggs['post_comment_num'][i])} | "
+                    f"reposts={_fmt(aggs['post_repost_num'][i])}"
+                )
+            return "\n".join(lines), [str(aggs["post_id"][i]) for i in picked]
+        if op == "avg":
+            return f"Average {label} per post{scope}: {_fmt(values.mean())} (over {len(idx):,} posts).", []
+        # op is "total" or "count"; single-post questions never get here (SINGLE_POST_PATTERNS)
+        return f"Total {label}{scope}, summed over all {len(idx):,} posts: {_fmt(values.sum())}.", []
+
+    if group == "account":
+        keys, values = _account_groups(aggs, metric, resolved)
+    else:
+        keys = aggs[group]
+        values = aggs[f"{group}_{metric}"] if metric else aggs[f"{group}_count"]
+        if resolved:
+            starts = keys.astype("datetime64[s]")
+            mask = (starts >= resolved[0]) & (starts < resolved[1])
+            keys, values = keys[mask], values[mask]
+    if len(keys) == 0:
+        return f"There are no posts{scope}.", []
+    names = [f"uid={k or '(unknown)'}" for k in keys] if group == "account" else [str(k) for k in keys]
+
+    what = f"total {label}" if metric else "posts"
+    if op in ("top", "bottom"):
+        order = np.argsort(values, kind="stable")
+        if op == "top":
+            order = order[::-1]
+        word = "most" if op == "top" else "fewest"
+        lines = [f"{group.capitalize()}(s) with the {word} {label}{scope}:"]
+        for rank, i in enumerate(order[:n], start=1):
+            lines.append(f"{rank}. {names[i]}: {_fmt(values[i])} {what}")
+        return "\n".join(lines), []
+    if op == "avg":
+        span = "" if group == "account" else f", {keys[0]} to {keys[-1]}"
+        return (
+            f"Average {label} per {group}{scope}: {_fmt(values.mean())} "
+            f"(over {len(keys):,} {group}s with posts{span}).",
+            [],
+        )
+    lines = [f"{what.capitalize()} per {group}{scope}:"]
+    lines.extend(f"{name}: {_fmt(v)}" for name, v in zip(names, values))
+    if op == "total":
+        lines.append(f"Total: {_fmt(values.sum())}")
+    return "\n".join(lines), []
+
+
+def post_owners(aggs: Dict[str, np.ndarray], post_ids: List[str]) -> Dict[str, str]:
+    """
+    Maps post_id -> account uid for the given posts ("" when the aggregates carry no uid).
+    """
+    if "post_uid" not in aggs:
+        return {pid: "" for pid in post_ids}
+    mask = np.isin(aggs["post_id"], post_ids)
+    return {str(pid): str(uid) for pid, uid in zip(aggs["post_id"][mask], aggs["post_uid"][mask])}
+
+
+# ---------- Routing examples (run this file to check the classifier) ----------
+# (question, (op, metric) it must route to, or None for questions that must stay on retrieval)
+ROUTING_EXAMPLES = [
+    ("Which post got the most likes?", ("top", "like_num")),
+    ("What is his most liked post?", ("top", "like_num")),
+    ("How many likes in total in December 2024?", ("total", "like_num")),
+    ("average reposts per month", ("avg", "repost_num")),
+    ("top 3 posts by comments in 2024", ("top", "comment_num")),
+    ("how many posts in October", ("count", None)),
+    ("How many posts did he share in 2025?", ("count", None)),
+    ("哪个月发的微博最多？", ("top", None)),
+    ("哪一天评论最多", ("top", "comment_num")),
+    ("点赞最多的微博是哪条", ("top", "like_num")),
+    ("最受欢迎的微博是哪条", ("top", "like_num")),
+    ("What does he like the most?", None),
+    ("What kind of roles does he like most?", None),
+    ("Which drama does he like best?", None),
+    ("Who does he comment on most?", None),
+    ("他称赞最多的人是谁", None),
+    ("What did he say about his latest drama?", None),
+    ("他最近的动态是什么？", None),
+    ("How many posts in 2023-24?", None),
+    ("how many posts in 2024-13", None),
+    ("10月32日发了多少条微博", None),
+    ("What is his most commented post?", ("top", "comment_num")),
+    ("What is his most reposted post?", ("top", "repost_num")),
+    ("top 3 most commented posts", ("top", "comment_num")),
+    ("Which post with the most likes?", ("top", "like_num")),
+    ("How many posts did he publish last month?", ("count", None)),
+    ("How many posts this year?", ("count", None)),
+    ("他上个月发了多少条微博", ("count", None)),
+    ("他去年发了多少微博", ("count", None)),
+    ("今年点赞最多的微博是哪条", ("top", "like_num")),
+    ("How many likes did his latest post get?", None),
+    ("最近一条微博有多少点赞", None),
+    ("How many likes does his newest drama promo have?", None),
+    ("Which of his recent posts got the most likes?", None),
+    ("How many likes did his post on October 20 get?", None),
+    ("how many posts with video", None),
+    ("有视频的微博有多少条", None),
+    ("how many posts did each account make", ("count", None)),
+    ("which account got the most likes", ("top", "like_num")),
+    ("哪个账号发的微博最多", ("top", None)),
+    ("How many posts did he publish this week?", None),
+]
+
+if __name__ == "__main__":
+    failures = 0
+    for question, expected in ROUTING_EXAMPLES:
+        query = classify_aggregate_question(question)
+        got = (query["op"], query["metric"]) if query else None
+        status = "ok " if got == expected else "FAIL"
+        failures += got != expected
+        print(f"[{status}] {question!r} -> {got} (expected {expected})")
+    print(f"{len(ROUTING_EXAMPLES) - failures}/{len(ROUTING_EXAMPLES)} routing examples pass.")
+    raise SystemExit(1 if failures else 0)
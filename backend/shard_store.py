@@ -0,0 +1,214 @@
+import os
+import json
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from post_analytics import build_post_aggregates, load_post_aggregates, merge_post_aggregates
+from time_question_helper import get_most_recent_docs, parse_created_at
+
+BASE_DIR = Path(__file__).resolve().parent
+SHARDS_DIR = BASE_DIR / "weibo_shards"
+MANIFEST_FILENAME = "manifest.json"
+DEFAULT_MEMORY_BUDGET_MB = int(os.getenv("WEIBO_SHARD_MEMORY_MB", "2048"))
+DEFAULT_MAX_WORKERS = int(os.getenv("WEIBO_SHARD_WORKERS", "8"))
+
+
+# ---------- Shard manifest ----------
+def load_shard_manifest(shards_dir: str = str(SHARDS_DIR)) -> dict:
+    """
+    manifest.json = {"embedding_provider": ..., "shards": {uid: {"index_dir", "nickname", "description", "num_posts", "num_vectors", "size_bytes", "built_at"}}}
+    """
+    path = os.path.join(str(shards_dir), MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {"embedding_provider": None, "shards": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_shard_manifest(manifest: dict, shards_dir: str = str(SHARDS_DIR)) -> str:
+    os.makedirs(str(shards_dir), exist_ok=True)
+    path = os.path.join(str(shards_dir), MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)  # readers never see a half-written manifest
+    return path
+
+def dir_size_bytes(path: str) -> int:
+    return sum(p.stat().st_size for p in Path(path).iterdir() if p.is_file())
+
+def describe_accounts(manifest: dict, uids: List[str]) -> str:
+    """
+    Prompt-friendly name for the accounts being asked about, e.g. "罗云熙Leo (歌手，演员)".
+    """
+    shards = manifest.get("shards", {})
+    names = []
+    for uid in uids:
+        info = shards.get(uid, {})
+        name = info.get("nickname") or f"user {uid}"
+        if info.get("description"):
+            name = f"{name} ({info['description']})"
+        names.append(name)
+    if not names:
+        return "a Weibo user"
+    if len(names) > 5:
+        return f"{len(names)} Weibo accounts, including " + ", ".join(names[:5])
+    return ", ".join(names)
+
+
+# ---------- Lazily loaded shards with LRU eviction under a memory budget ----------
+class ShardStore:
+    """
+    Loads per-account FAISS shards on first use and evicts the least recently used ones
+    once their estimated size (on-disk size of the shard directory) exceeds the budget.
+    """
+
+    def __init__(self, embeddings, shards_dir: str = str(SHARDS_DIR),
+                 memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.embeddings = embeddings
+        self.shards_dir = str(shards_dir)
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.max_workers = max(1, max_workers)
+        self.manifest = load_shard_manifest(self.shards_dir)
+
+        self._loaded: "OrderedDict[str, Tuple[FAISS, int]]" = OrderedDict()
+        self._aggregates: Dict[str, dict] = {}
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def uids(self) -> List[str]:
+        return sorted(self.manifest.get("shards", {}).keys())
+
+    def loaded_uids(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded.keys())
+
+    def reload_manifest(self) -> List[str]:
+        """
+        Picks up shards added or rebuilt since startup; cached indexes and aggregates of rebuilt
+        (changed built_at) or removed shards are dropped so the next query loads the new files.
+        """
+        manifest = load_shard_manifest(self.shards_dir)
+        old_shards = self.manifest.get("shards", {})
+        new_shards = manifest.get("shards", {})
+        stale = [
+            uid for uid, info in old_shards.items()
+            if uid not in new_shards or new_shards[uid].get("built_at") != info.get("built_at")
+        ]
+        with self._lock:
+            self.manifest = manifest
+            for uid in stale:
+                entry = self._loaded.pop(uid, None)
+                if entry is not None:
+                    self._loaded_bytes -= entry[1]
+                self._aggregates.pop(uid, None)
+        if stale:
+            print(f"Shards rebuilt or removed since last load: {stale}")
+        return stale
+
+    def _shard_dir(self, uid: str) -> str:
+        info = self.manifest.get("shards", {}).get(uid)
+        if info is None:
+            raise KeyError(f"No shard for account {uid} in {self.shards_dir}")
+        return os.path.join(self.shards_dir, info.get("index_dir", uid))
+
+    def _get_entry(self, uid: str) -> Tuple[FAISS, int]:
+        with self._lock:
+            entry = self._loaded.get(uid)
+            if entry is not None:
+                self._loaded.move_to_end(uid)
+                return entry
+            load_lock = self._load_locks.setdefault(uid, threading.Lock())
+
+        # Load outside the store lock so other shards stay available; one loader per shard
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(uid)
+                if entry is not None:
+                    self._loaded.move_to_end(uid)
+                    return entry
+
+            shard_dir = self._shard_dir(uid)
+            print(f"Loading shard {uid} from: {shard_dir}")
+            vectorstore = FAISS.load_local(shard_dir, self.embeddings, allow_dangerous_deserialization=True)
+            entry = (vectorstore, dir_size_bytes(shard_dir))
+
+            with self._lock:
+                self._loaded[uid] = entry
+                self._loaded_bytes += entry[1]
+                self._evict(keep=uid)
+            return entry
+
+    def _evict(self, keep: str):
+        # Caller holds self._lock. Searches already holding an evicted vectorstore keep their reference.
+        while self._loaded_bytes > self.memory_budget_bytes and len(self._loaded) > 1:
+            uid, (_, size) = next(iter(self._loaded.items()))
+            if uid == keep:
+                self._loaded.move_to_end(uid)
+                continue
+            del self._loaded[uid]
+            self._loaded_bytes -= size
+            print(f"Evicted shard {uid} ({size / 1024 / 1024:.1f} MB)")
+
+    def get_vectorstore(self, uid: str) -> FAISS:
+        return self._get_entry(uid)[0]
+
+    def get_aggregates(self, uid: str) -> dict:
+        # Aggregates are tiny next to the FAISS index, so they stay cached after their shard is evicted
+        with self._lock:
+            aggregates = self._aggregates.get(uid)
+        if aggregates is None:
+            aggregates = load_post_aggregates(self._shard_dir(uid))
+            if aggregates is None:
+                vectorstore = self.get_vectorstore(uid)
+                aggregates = build_post_aggregates([d.metadata for d in vectorstore.docstore._dict.values()])
+            # The shard is authoritative for the account, also for aggregates saved without post_uid
+            aggregates = {**aggregates, "post_uid": np.full(len(aggregates["post_id"]), uid)}
+            with self._lock:
+                self._aggregates[uid] = aggregates
+        return aggregates
+
+    def get_merged_aggregates(self, uids: List[str]) -> dict:
+        return merge_post_aggregates([self.get_aggregates(uid) for uid in uids])
+
+
+# ---------- Parallel fan-out search with global top-k merge ----------
+def tag_uid(doc: Document, uid: str) -> Document:
+    return Document(page_content=doc.page_content, metadata={**(doc.metadata or {}), "uid": uid})
+
+def _search_shard(store: ShardStore, uid: str, query_vector: List[float], k: int, recent_n: int) -> Tuple[List[Tuple[Document, float]], List[Document]]:
+    vectorstore = store.get_vectorstore(uid)
+    scored = vectorstore.similarity_search_with_score_by_vector(query_vector, k=k)
+    recent = get_most_recent_docs(vectorstore, n=recent_n) if recent_n > 0 else []
+    return [(tag_uid(d, uid), score) for d, score in scored], [tag_uid(d, uid) for d in recent]
+
+def search_shards(store: ShardStore, query: str, uids: Optional[List[str]] = None, k: int = 5,
+                  recent_n: int = 0) -> Tuple[List[Document], List[Document]]:
+    """
+    Embeds the query once, searches the target shards concurrently and merges the
+    per-shard top-k into a global top-k by L2 distance (all shards share one embedding model).
+    Returns (top-k docs, up to recent_n newest docs across the shards).
+    """
+    uids = uids or store.uids()
+    if not uids:
+        return [], []
+
+    query_vector = store.embeddings.embed_query(query)
+    workers = min(len(uids), store.max_workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda uid: _search_shard(store, uid, query_vector, k, recent_n), uids))
+
+    scored = [pair for shard_scored, _ in results for pair in shard_scored]
+    top = [d for d, _ in heapq.nsmallest(k, scored, key=lambda pair: pair[1])]
+
+    recent = [d for _, shard_recent in results for d in shard_recent]
+    recent = heapq.nlargest(recent_n, recent, key=parse_created_at)
+    return top, recent
@@ -1,17 +1,20 @@
 from buildFAISSIndex import get_embedding_model, build_faiss_index
 from time_question_helper import looks_like_recent_question, parse_created_at, get_most_recent_docs, dedupe_docs
+from post_analytics import build_post_aggregates, load_post_aggregates, classify_aggregate_question, run_aggregate_query, post_owners
+from shard_store import ShardStore, SHARDS_DIR, search_shards, describe_accounts, tag_uid
 
 from langchain_openai import ChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
 import os
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 FAISS_INDEX_PATH = BASE_DIR / "weibo_faiss_index"
+DEFAULT_SUBJECT = "a Chinese actor"
 
 
 # ---------- Setup LLM and embeddings ----------
@@ -45,6 +48,30 @@ def load_faiss_vectorstore(index_path: str = str(FAISS_INDEX_PATH)) -> FAISS:
 
     return vectorstore
 
+# ---------- Load per-account shards (lazily, see shard_store.py) ----------
+def load_shard_store(shards_dir: str = str(SHARDS_DIR)) -> ShardStore:
+    store = ShardStore(embeddings, shards_dir=shards_dir)
+    print(f"Shard manifest lists {len(store.uids())} accounts in: {shards_dir}")
+    return store
+
+# ---------- Load post aggregates ----------
+def load_aggregates(vectorstore: FAISS, index_path: str = str(FAISS_INDEX_PATH)) -> dict:
+    aggregates = load_post_aggregates(index_path)
+    if aggregates is None:
+        # Index built before aggregates existed: derive them from the docstore metadata
+        print("Building post aggregates from the loaded docstore...")
+        aggregates = build_post_aggregates([d.metadata for d in vectorstore.docstore._dict.values()])
+    return aggregates
+
+def get_docs_by_post_ids(vectorstore: FAISS, post_ids: List[str]) -> List[Document]:
+    wanted = set(post_ids)
+    found = {}
+    for d in vectorstore.docstore._dict.values():
+        pid = (d.metadata or {}).get("post_id")
+        if pid in wanted and pid not in found:
+            found[pid] = d
+    return [found[pid] for pid in post_ids if pid in found]
+
 # ---------- Format retrieved docs into context text ----------
 def format_context(docs: List[Document]) -> str:
     parts = []
@@ -64,9 +91,9 @@ def format_context(docs: List[Document]) -> str:
     return "\n\n".join(parts)
 
 # ---------- Expand query using LLM ----------
-def expand_query(question: str) -> str:
+def expand_query(question: str, subject: str = DEFAULT_SUBJECT) -> str:
     prompt = f"""
-        You are helping to improve search over a Chinese actor's Weibo posts.
+        You are helping to improve search over the Weibo posts of {subject}.
 
         The user will ask a question (in Chinese or English).
         Your task is to rewrite it into a short, focused search query that:
@@ -94,29 +121,56 @@ def expand_query(question: str) -> str:
         return question
     
 
-# ---------- Answer a question ----------
-def answer_question(question: str, vectorstore: FAISS, k: int = 5) -> Tuple[str, List[Document]]:
-    # Expand query
-    expanded_query = expand_query(question)
-    print(f"[DEBUG] Original question: {question}")
-    print(f"[DEBUG] Expanded query:   {expanded_query}")
+# ---------- Answer an aggregate question from precomputed stats ----------
+def phrase_aggregate_answer(question: str, facts: str, subject: str = DEFAULT_SUBJECT) -> str:
+    prompt = f"""
+You are a bilingual assistant (Chinese and English) answering questions about the Weibo posts of {subject}.
 
-    # retrieve more than k, trim later
-    RETRIEVAL_FLOOR_FOR_RECENT = 15
-    FINAL_CONTEXT_CAP = k
-    semantic_k = max(k, RETRIEVAL_FLOOR_FOR_RECENT) if looks_like_recent_question(question) else k
-    retriever = vectorstore.as_retriever(search_kwargs={"k": semantic_k})
-    docs = retriever.invoke(expanded_query)  # list[Document]
-    print("semantic docs:", len(docs))
+The statistics below were computed exactly over ALL of their posts.
+Rephrase them as a short, natural answer to the user's question.
+Do not change, round away or invent any numbers, dates or post ids.
+If the question is in Chinese, answer in Chinese. If it is in English, answer in English.
 
-    # If user asks "recent/latest", add newest posts to context
-    if looks_like_recent_question(question):
-        recent_docs = get_most_recent_docs(vectorstore, n=8)
-        for d in recent_docs:
-            m = d.metadata or {}
-            print(m.get("created_at"), m.get("post_id"), m.get("weibo_id"))
-        docs = dedupe_docs(docs + recent_docs)
-        print("after dedupe:", len(docs))
+/* User question: */
+{question}
+
+/* Statistics: */
+{facts}
+
+Answer:
+""".strip()
+
+    try:
+        answer = llm.invoke(prompt).content.strip()
+        return answer or facts
+    except Exception as e:
+        print(f"Error phrasing aggregate answer: {e}")
+        return facts
+
+def get_shard_docs_by_post_ids(store: ShardStore, aggregates: dict, post_ids: List[str]) -> List[Document]:
+    # Only load the shards holding the posts the answer refers to
+    owners = post_owners(aggregates, post_ids)
+    docs = []
+    for uid in dict.fromkeys(owners[pid] for pid in post_ids if owners.get(pid)):
+        uid_post_ids = [pid for pid in post_ids if owners.get(pid) == uid]
+        docs.extend(tag_uid(d, uid) for d in get_docs_by_post_ids(store.get_vectorstore(uid), uid_post_ids))
+    rank = {pid: i for i, pid in enumerate(post_ids)}
+    docs.sort(key=lambda d: rank.get((d.metadata or {}).get("post_id"), len(rank)))
+    return docs
+
+def answer_aggregate_question(question: str, query: dict, aggregates: dict, find_docs: Callable[[List[str]], List[Document]],
+                              phrase_with_llm: bool = True, subject: str = DEFAULT_SUBJECT) -> Tuple[str, List[Document]]:
+    facts, post_ids = run_aggregate_query(query, aggregates)
+    print(f"[DEBUG] Aggregate query: {query}")
+    print(f"[DEBUG] Aggregate facts: {facts}")
+
+    docs = find_docs(post_ids) if post_ids else []
+    answer = phrase_aggregate_answer(question, facts, subject) if phrase_with_llm else facts
+    return answer, docs
+
+# ---------- Build the final prompt and call the LLM ----------
+def generate_answer(question: str, expanded_query: str, docs: List[Document], k: int, subject: str = DEFAULT_SUBJECT) -> Tuple[str, List[Document]]:
+    FINAL_CONTEXT_CAP = k
 
     # sort by time desc
     docs = sorted(docs, key=parse_created_at, reverse=True)
@@ -135,7 +189,7 @@ def answer_question(question: str, vectorstore: FAISS, k: int = 5) -> Tuple[str,
     context = format_context(docs)
 
     prompt = f"""
-You are a bilingual assistant (Chinese and English) answering questions about a Chinese actor's Weibo posts.
+You are a bilingual assistant (Chinese and English) answering questions about the Weibo posts of {subject}.
 
 You are given some Weibo posts (each has Chinese and English text).
 Use ONLY this content to answer the user's question.
@@ -165,6 +219,87 @@ Answer:
     answer = llm.invoke(prompt).content
     return answer, docs
 
+# ---------- Answer a question ----------
+def answer_question(question: str, vectorstore: FAISS, k: int = 5, aggregates: Optional[dict] = None,
+                    phrase_with_llm: bool = True, subject: str = DEFAULT_SUBJECT) -> Tuple[str, List[Document]]:
+    # Aggregate questions (most liked, posts per month...) are answered exactly, without retrieval
+    if aggregates is not None:
+        query = classify_aggregate_question(question)
+        if query is not None:
+            return answer_aggregate_question(
+                question, query, aggregates, lambda post_ids: get_docs_by_post_ids(vectorstore, post_ids),
+                phrase_with_llm=phrase_with_llm, subject=subject,
+            )
+
+    # Expand query
+    expanded_query = expand_query(question, subject)
+    print(f"[DEBUG] Original question: {question}")
+    print(f"[DEBUG] Expanded query:   {expanded_query}")
+
+    # retrieve more than k, trim later
+    RETRIEVAL_FLOOR_FOR_RECENT = 15
+    semantic_k = max(k, RETRIEVAL_FLOOR_FOR_RECENT) if looks_like_recent_question(question) else k
+    retriever = vectorstore.as_retriever(search_kwargs={"k": semantic_k})
+    docs = retriever.invoke(expanded_query)  # list[Document]
+    print("semantic docs:", len(docs))
+
+    # If user asks "recent/latest", add newest posts to context
+    if looks_like_recent_question(question):
+        recent_docs = get_most_recent_docs(vectorstore, n=8)
+        for d in recent_docs:
+            m = d.metadata or {}
+            print(m.get("created_at"), m.get("post_id"), m.get("weibo_id"))
+        docs = dedupe_docs(docs + recent_docs)
+        print("after dedupe:", len(docs))
+
+    return generate_answer(question, expanded_query, docs, k, subject)
+
+# ---------- Answer a question across account shards ----------
+def answer_question_for_accounts(question: str, store: ShardStore, uids: Optional[List[str]] = None, k: int = 5,
+                                 phrase_with_llm: bool = True) -> Tuple[str, List[Document]]:
+    """
+    uids=None fans out over every account in the shard manifest; otherwise only the given accounts are searched.
+    """
+    known = set(store.uids())
+    requested = uids or store.uids()
+    unknown = [uid for uid in requested if uid not in known]
+    if unknown:
+        print(f"⚠️ No shards for accounts: {unknown}")
+    uids = [uid for uid in requested if uid in known]
+    if not uids:
+        missing = f" ({', '.join(unknown)})" if unknown else ""
+        return (
+            f"没有找到这些账号的微博索引{missing}，请先构建索引。(No account shards are available{missing}; build them first.)",
+            []
+        )
+
+    subject = describe_accounts(store.manifest, uids)
+    print(f"[DEBUG] Accounts: {len(uids)} ({subject})")
+
+    query = classify_aggregate_question(question)
+    if query is not None:
+        aggregates = store.get_merged_aggregates(uids)
+        return answer_aggregate_question(
+            question, query, aggregates, lambda post_ids: get_shard_docs_by_post_ids(store, aggregates, post_ids),
+            phrase_with_llm=phrase_with_llm, subject=subject,
+        )
+
+    expanded_query = expand_query(question, subject)
+    print(f"[DEBUG] Original question: {question}")
+    print(f"[DEBUG] Expanded query:   {expanded_query}")
+
+    RETRIEVAL_FLOOR_FOR_RECENT = 15
+    is_recent = looks_like_recent_question(question)
+    semantic_k = max(k, RETRIEVAL_FLOOR_FOR_RECENT) if is_recent else k
+    docs, recent_docs = search_shards(store, expanded_query, uids, k=semantic_k, recent_n=8 if is_recent else 0)
+    print("semantic docs:", len(docs))
+
+    if recent_docs:
+        docs = dedupe_docs(docs + recent_docs)
+        print("after dedupe:", len(docs))
+
+    return generate_answer(question, expanded_query, docs, k, subject)
+
 if __name__ == "__main__":
     print("Weibo QA assistant ready. Ask a question (Chinese or English).")
     print("Example: 罗云熙最近在微博上有提到他的工作计划吗？")
@@ -172,6 +307,7 @@ if __name__ == "__main__":
     print("-" * 60)
 
     vectorstore = load_faiss_vectorstore()
+    aggregates = load_aggregates(vectorstore)
     try:
         while True:
             q = input("\nYour question (or 'exit'): ").strip()
@@ -179,7 +315,7 @@ if __name__ == "__main__":
                 print("Bye!")
                 break
 
-            ans, docs = answer_question(q, vectorstore, k=5)
+            ans, docs = answer_question(q, vectorstore, k=5, aggregates=aggregates)
             print("\n--- Answer ---")
             print(ans)
     except KeyboardInterrupt:
@@ -1,23 +1,46 @@
 import streamlit as st
-from weiboQA import load_faiss_vectorstore, answer_question
+from weiboQA import load_faiss_vectorstore, load_aggregates, load_shard_store, answer_question, answer_question_for_accounts
 
 # ---------- Cache the vectorstore so it's not reloaded every time ----------
 @st.cache_resource
 def get_vectorstore():
     return load_faiss_vectorstore()
 
+@st.cache_resource
+def get_aggregates():
+    return load_aggregates(get_vectorstore())
+
+# ---------- One shard store per process; shards load lazily on first query ----------
+@st.cache_resource
+def get_shard_store():
+    return load_shard_store()
+
 # ---------- Streamlit app UI ----------
 def main():
     st.set_page_config(page_title="Weibo GenAI QA", page_icon="🐣", layout="wide")
     st.title("🐣 Weibo GenAI QA (Bilingual)")
 
     st.markdown(
-        "Ask questions about the actor's Weibo posts in **Chinese or English**.\n\n"
+        "Ask questions about the Weibo posts in **Chinese or English**.\n\n"
         "The assistant answers using only the scraped Weibo posts (Chinese + English translation)."
     )
 
-    # Load vectorstore once
-    vectorstore = get_vectorstore()
+    # Multi-account mode when per-account shards have been built, else the single index
+    store = get_shard_store()
+    store.reload_manifest()  # cheap JSON read; picks up shards built while the app is running
+    account_names = {
+        uid: (info.get("nickname") or uid) for uid, info in store.manifest.get("shards", {}).items()
+    }
+    if account_names:
+        selected_uids = st.multiselect(
+            "Accounts to search (leave empty to search all):",
+            options=store.uids(),
+            format_func=lambda uid: f"{account_names[uid]} ({uid})",
+        )
+    else:
+        # Load vectorstore once
+        vectorstore = get_vectorstore()
+        aggregates = get_aggregates()
 
     # User input
     question = st.text_area(
@@ -27,13 +50,17 @@ def main():
     )
 
     k = st.slider("Max number of posts used in the answer:", min_value=1, max_value=10, value=5)
+    phrase_with_llm = st.checkbox("Phrase statistics answers (likes, post counts...) with the LLM", value=True)
 
     if st.button("Ask"):
         if not question.strip():
             st.warning("Please enter a question.")
         else:
             with st.spinner("Thinking..."):
-                answer, docs = answer_question(question, vectorstore, k=k)
+                if account_names:
+                    answer, docs = answer_question_for_accounts(question, store, uids=selected_uids, k=k, phrase_with_llm=phrase_with_llm)
+                else:
+                    answer, docs = answer_question(question, vectorstore, k=k, aggregates=aggregates, phrase_with_llm=phrase_with_llm)
 
             st.subheader("Answer")
             st.write(answer)
@@ -51,8 +78,11 @@ def main():
                         raw_zh = m.get("raw_zn") or ""
                         raw_en = m.get("raw_en") or ""
 
+                        account = account_names.get(m.get("uid"), m.get("uid"))
+                        account_label = f"  |  account: {account}" if account else ""
+
                         st.markdown(
-                            f"**Post {i}**  |  time: `{created_at}`  |  👍 {likes}  💬 {comments}  🔁 {reposts}"
+                            f"**Post {i}**{account_label}  |  time: `{created_at}`  |  👍 {likes}  💬 {comments}  🔁 {reposts}"
                         )
 
                         # Show original Chinese and English separately if available
@@ -1,5 +1,6 @@
 from weibo_crawler import Profile, Follow, Weibos
 from pathlib import Path
+import csv
 import os
 
 cookies = os.getenv("WEIBO_COOKIES", "")
@@ -48,6 +49,27 @@ def get_user_posts(username: str):
         print("⚠️ Error crawling posts:", e)
         return False
 
+def get_followed_users_posts(username: str):
+    """
+    Crawls profile + posts for every account `username` follows (from follows.csv),
+    so each one can get its own index shard (buildFAISSIndex.py --shards).
+    """
+    follows_csv = _raw_path("follows.csv")
+    if not follows_csv.exists():
+        print("⚠️ follows.csv not found, crawl follows first:", follows_csv)
+        return []
+    with open(follows_csv, newline="", encoding="utf-8") as f:
+        uids = [row["uid2"] for row in csv.DictReader(f) if row.get("uid1") == str(username) and row.get("uid2")]
+
+    crawled = []
+    for uid in dict.fromkeys(uids):
+        print(f"Crawling followed account: {uid}")
+        get_user_profile(uid)
+        if get_user_posts(uid):
+            crawled.append(uid)
+    print(f"✅ Crawled posts for {len(crawled)}/{len(set(uids))} followed accounts.")
+    return crawled
+
 if __name__ == "__main__":
     username = ""  # example username
     print(f"Starting to crawl data for user: {username}")